@@ -1,5 +1,8 @@
 import logging
 import os
+import atexit
+import queue
+from logging.handlers import QueueHandler, QueueListener
 import mizuba as mz  # type: ignore
 
 # Create the logger.
@@ -15,8 +18,23 @@ formatter = logging.Formatter(
 c_handler = logging.StreamHandler()
 c_handler.setFormatter(formatter)
 
-# Link handler to logger.
-logger.addHandler(c_handler)
+# NOTE: the handler is not linked directly to the logger. Instead, the logger
+# pushes the log records into a queue, and the handler is invoked by a listener
+# running in a dedicated thread. This ensures that logging calls do not block
+# on stderr I/O.
+q: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+q_handler = QueueHandler(q)
+q_listener = QueueListener(q, c_handler)
+
+# Link the queue handler to logger.
+logger.addHandler(q_handler)
+
+# Start the listener thread.
+# NOTE: the listener is started once per process, and it is stopped (flushing
+# all the pending log records) at interpreter exit. It is not tied to the app's
+# lifespan, which may be entered multiple times within the same process.
+q_listener.start()
+atexit.register(q_listener.stop)
 
 # Activate verbose output in development mode.
 if os.getenv("ARROYO_BACKEND_DEVELOPMENT") is not None:
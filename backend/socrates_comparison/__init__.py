@@ -1,22 +1,38 @@
-from fastapi import APIRouter
-from ._data import _get_conjunctions
-from typing import Any, cast
-from ._response_models import rows_response
-from ._request_models import rows_request, range_filter_fns
+from fastapi import APIRouter, Response
+from pydantic_core import to_json
+from ._data import (
+    _get_conjunctions,
+    _get_sort_permutation,
+    _get_tot_nrows,
+    _set_tot_nrows,
+)
+from functools import reduce
+import operator
+from ._response_models import rows_response, single_row
+from ._request_models import rows_request
+from ._filters import _build_filters, _filters_key
 from ._expanded_rows_data import _compute_expanded_rows_data
 import polars as pl
 import logging
 
+# The columns of the conjunctions dataframe which are sent to the frontend.
+# NOTE: the expanded rows data is not part of the conjunctions dataframe,
+# it is computed separately for each request.
+_rows_cols = [_ for _ in single_row.model_fields if _ != "expanded_data"]
+
 router = APIRouter(
     prefix="/socrates_comparison",
     tags=["socrates_comparison"],
 )
 
 
-@router.post("/", response_model=rows_response)
+# NOTE: the response is serialised directly to JSON (see the end of
+# get_conjunctions()). Thus, we do not set up a response model for
+# the endpoint, and we use rows_response only for documentation purposes.
+@router.post("/", response_model=None, responses={200: {"model": rows_response}})
 def get_conjunctions(
     params: rows_request,
-) -> Any:
+) -> Response:
     logger = logging.getLogger("arroyo")
 
     logger.debug("Processing get_conjunctions() request")
@@ -24,210 +40,91 @@ def get_conjunctions(
     # Fetch the conjunction data.
     cdata, pj = _get_conjunctions()
 
-    # Fetch the dataframe and a lazy version of it.
+    # Fetch the dataframe.
     conj = cdata.df
-    df = conj.lazy()
-
-    # If we have filtering to do, we will collect the filtering expressions
-    # here and apply them all at once later.
-    filters: list[pl.Expr] = []
-
-    # Handle column filtering.
-    if params.filters:
-        for cur_filter in params.filters:
-            # Extract the column's name, the filter function
-            # and the filter value.
-            col = cur_filter.id
-            filter_f = getattr(params.filter_fns, col)
-            filter_v = cur_filter.value
-
-            # The filter values are passed as strings or lists of strings.
-            # Try to convert them to the appropriate types based on the column.
-            # If the conversion fails, ignore the filter and move to the next column.
-            match col:
-                case "norad_ids":
-                    # Filtering based on the exact match of one of the two norad IDs.
-                    # We need to convert the filter value to an int.
-                    try:
-                        norad_id = int(cast(str, filter_v))
-
-                        # NOTE: negative norad IDs are not valid.
-                        if norad_id < 0:
-                            continue
-                    except Exception:
-                        continue
-
-                    # Add the filter.
-                    filters.append(
-                        (pl.col("norad_id_i") == norad_id)
-                        | (pl.col("norad_id_j") == norad_id)
-                    )
-
-                case "object_names":
-                    # Filtering based on object names.
-                    substr = cast(str, filter_v)
-
-                    # Check if the user specified names for one or both objects.
-                    str_l = substr.split(":")
-
-                    if len(str_l) == 2:
-                        # The user passed a string of type "a:b". We interpret this
-                        # as the user asking for conjunctions in which one object name
-                        # contains "a" and the other object name contains "b".
-
-                        # Strip the individual names.
-                        str_l = list(s.strip() for s in str_l)
-
-                        # Apply the filter.
-                        filters.append(
-                            (
-                                (
-                                    pl.col("object_name_i").str.contains_any(
-                                        [str_l[0]], ascii_case_insensitive=True
-                                    )
-                                )
-                                & (
-                                    pl.col("object_name_j").str.contains_any(
-                                        [str_l[1]], ascii_case_insensitive=True
-                                    )
-                                )
-                            )
-                            | (
-                                (
-                                    pl.col("object_name_i").str.contains_any(
-                                        [str_l[1]], ascii_case_insensitive=True
-                                    )
-                                )
-                                & (
-                                    pl.col("object_name_j").str.contains_any(
-                                        [str_l[0]], ascii_case_insensitive=True
-                                    )
-                                )
-                            )
-                        )
-                    else:
-                        # Interpret substr as a single object name.
-
-                        # Strip it.
-                        substr = substr.strip()
-
-                        # Apply the filter.
-                        filters.append(
-                            (
-                                pl.col("object_name_i").str.contains_any(
-                                    [substr], ascii_case_insensitive=True
-                                )
-                            )
-                            | (
-                                pl.col("object_name_j").str.contains_any(
-                                    [substr], ascii_case_insensitive=True
-                                )
-                            )
-                        )
-
-                case _:
-                    # In all the other cases, we are dealing with range-based filtering.
-                    if isinstance(filter_v, list):
-                        # A filter of type 'list' means that the filter function
-                        # is 'between' or 'between_inclusive'.
-
-                        # Attempt to convert the filter value to a list of floats.
-                        try:
-                            value_range = list(float(_) for _ in filter_v)
-                        except Exception:
-                            continue
-
-                        # Add the filter.
-                        if filter_f == range_filter_fns.between:
-                            filters.append(pl.col(col) > value_range[0])
-                            filters.append(pl.col(col) < value_range[1])
-                        else:
-                            assert filter_f == range_filter_fns.between_inclusive
-                            filters.append(pl.col(col) >= value_range[0])
-                            filters.append(pl.col(col) <= value_range[1])
-                    else:
-                        # A filter of type 'str' means that the filter function
-                        # is greater/less_than.
-
-                        # Attempt to convert the filter value to a float.
-                        try:
-                            value = float(filter_v)
-                        except Exception:
-                            continue
-
-                        # Add the filter.
-                        if filter_f == range_filter_fns.greater_than:
-                            filters.append(pl.col(col) > value)
-                        else:
-                            assert filter_f == range_filter_fns.less_than
-                            filters.append(pl.col(col) < value)
-
-    # Apply the filter(s), if any.
-    if filters:
-        df = df.filter(*filters)
-
-    # Handle sorting.
-    if params.sorting:
-        sort_cols = [_.id for _ in params.sorting]
-        desc = [_.desc for _ in params.sorting]
 
-        df = df.sort(by=sort_cols, descending=desc)
+    # Build the filtering expressions, if any.
+    filters = _build_filters(params)
 
-    # Fetch the requested row range.
-    sub_df = df[params.begin : params.begin + params.nrows]
+    # The columns to be fetched.
+    # NOTE: we select only the columns which are sent to the frontend,
+    # which allows polars to avoid materialising the other columns. We also
+    # select the preformatted tca column, which will replace the datetime tca
+    # column after the computation of the expanded rows data.
+    cols = pl.col(*_rows_cols, "tca_str")
 
-    # Collect it.
-    sub_df_coll = sub_df.collect()
+    if params.sorting:
+        # NOTE: extract the column names and the descending
+        # flags in a single pass over the sorting criteria.
+        sort_cols, desc = zip(*((_.id, _.desc) for _ in params.sorting))
+
+    if not filters:
+        # NOTE: without filters, the total number of rows is just the number
+        # of conjunctions, and the requested rows can be fetched directly
+        # from the conjunctions dataframe, bypassing the lazy engine.
+        tot_nrows = len(conj)
+
+        if params.sorting:
+            # NOTE: without filtering, we can fetch (or compute and cache)
+            # the permutation which sorts the entire conjunctions dataframe,
+            # and gather from it only the requested row range.
+            perm = _get_sort_permutation(cdata, sort_cols, desc)
+            sub_df_coll = conj.select(
+                cols.gather(perm.slice(params.begin, params.nrows))
+            )
+        else:
+            sub_df_coll = conj.slice(params.begin, params.nrows).select(cols)
+    else:
+        # Apply the filters to a lazy version of the dataframe.
+        # NOTE: the filters are applied before sorting, so that
+        # only the rows surviving the filters need to be sorted.
+        # NOTE: the filters are combined into a single predicate, which
+        # gives the polars optimiser a single expression tree to simplify.
+        df = conj.lazy().filter(reduce(operator.and_, filters))
+
+        # Build the query for the requested row range.
+        if params.sorting:
+            # NOTE: slice() on the lazy frame allows polars to push
+            # the row range down into the sort, which then needs to
+            # materialise only the first begin + nrows rows.
+            sub_df = (
+                df.sort(by=sort_cols, descending=desc)
+                .slice(params.begin, params.nrows)
+                .select(cols)
+            )
+        else:
+            sub_df = df.slice(params.begin, params.nrows).select(cols)
+
+        # Look the total number of rows up in the cache.
+        filters_key = _filters_key(params)
+        cached_tot_nrows = _get_tot_nrows(cdata, filters_key)
+
+        if cached_tot_nrows is None:
+            # Collect the requested rows together with the total number of rows.
+            # NOTE: the row count query is built on the filtered (but unsorted)
+            # lazy dataframe, as the sorting is irrelevant for the row count.
+            # NOTE: collecting both queries at once allows polars to evaluate
+            # the filtered subplan (which is common to both queries) only once.
+            sub_df_coll, tot_nrows_coll = pl.collect_all([sub_df, df.select(pl.len())])
+            tot_nrows = tot_nrows_coll.item()
+            _set_tot_nrows(cdata, filters_key, tot_nrows)
+        else:
+            sub_df_coll = sub_df.collect()
+            tot_nrows = cached_tot_nrows
 
     # Compute the expanded rows data.
     # NOTE: as an alternative to computing this data for each request, we could
     # precompute it in the data processor thread.
     expanded_rows_data = _compute_expanded_rows_data(pj, cdata, sub_df_coll)
 
-    # Compress the norad id columns into a single string column.
-    sub_df_coll = sub_df_coll.with_columns(
-        pl.concat_str(
-            pl.col("norad_id_i").cast(str),
-            pl.col("norad_id_j").cast(str),
-            separator=" | ",
-        ).alias("norad_ids")
-    )
-
-    # Compress object names and statuses into a single column.
+    # Replace the tca column with its preformatted string
+    # representation, and add the expanded rows data.
     sub_df_coll = sub_df_coll.with_columns(
-        pl.concat_str(
-            pl.col("object_name_i"),
-            pl.col("object_name_j"),
-            separator=" | ",
-        ).alias("object_names")
-    )
-
-    # Convert the tca column to UTC ISO string with ms precision.
-    sub_df_coll = sub_df_coll.with_columns(
-        pl.col("tca").dt.strftime("%Y-%m-%d %H:%M:%S.%3f")
-    )
-
-    # Convert to dicts.
-    rows = sub_df_coll.to_dicts()
-
-    # Add the expanded rows data.
-    rows = [
-        {
-            **row,
-            "expanded_data": expanded_rows_data[row_idx],
-        }
-        for row_idx, row in enumerate(rows)
-    ]
+        pl.col("tca_str").alias("tca"), expanded_rows_data
+    ).drop("tca_str")
 
     ret = {
-        "rows": rows,
-        # NOTE: this is a contraption to compute the length of a lazy dataframe:
-        #
-        # https://stackoverflow.com/questions/75523498/python-polars-how-to-get-the-row-count-of-a-lazyframe
-        #
-        # It is important that we do this instead of just len(conj)
-        # in order to account for filtering.
-        "tot_nrows": df.select(pl.len()).collect().item(),
+        "tot_nrows": tot_nrows,
         "tot_nconj": len(conj),
         "threshold": cdata.threshold,
         "conj_ts": cdata.timestamp,
@@ -237,6 +134,16 @@ def get_conjunctions(
         "date_end": cdata.date_end,
     }
 
+    # Serialise to JSON.
+    # NOTE: the response data is built from the conjunctions dataframe, whose
+    # schema is fixed and consistent with the response model. Thus, we serialise
+    # the rows directly via the polars JSON writer (which avoids the creation of
+    # a Python dict per row) and the rest of the data via pydantic's JSON serialiser,
+    # and we splice the two into a raw response, which bypasses the validation
+    # against the response model in FastAPI.
+    content = b'{"rows":' + sub_df_coll.write_json().encode() + b"," + to_json(ret)[1:]
+    resp = Response(content=content, media_type="application/json")
+
     logger.debug("get_conjunctions() request processed")
 
-    return ret
+    return resp
@@ -1,13 +1,74 @@
 import polars as pl
 import requests as rq  # type: ignore
-from io import StringIO
 from astropy.time import Time  # type: ignore
 import numpy as np
 import re
+from datetime import datetime
 from typing import Any
 import logging
 from concurrent.futures import ThreadPoolExecutor
 import mizuba as mz  # type: ignore
+from requests.adapters import HTTPAdapter  # type: ignore
+
+# HTTP session shared by the downloads from celestrak.
+# NOTE: the downloads are run concurrently from a thread pool and they
+# all hit the same host. Sharing a session allows to reuse the pooled
+# keep-alive connections across downloads and refresh cycles, instead
+# of performing a new TCP/TLS handshake for each download.
+_session = rq.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
+# Timeouts (connect, read) for the downloads from celestrak (in seconds).
+_download_timeout = (10, 60)
+
+# Dictionary associating a (lowercase) month abbreviation to a number.
+# NOTE: the month abbreviations in the socrates web page are always in English,
+# thus we do not rely on the locale-dependent parsing of strptime().
+_months_dict = {
+    m: n
+    for n, m in enumerate(
+        [
+            "jan",
+            "feb",
+            "mar",
+            "apr",
+            "may",
+            "jun",
+            "jul",
+            "aug",
+            "sep",
+            "oct",
+            "nov",
+            "dec",
+        ],
+        start=1,
+    )
+}
+
+# Pattern for the socrates start/stop dates, e.g., "2025 Feb 10 08:00:00".
+_socrates_date_pattern = re.compile(
+    rf"^(\d{{4}}) ({'|'.join(_months_dict)}) (\d{{2}}) (\d{{2}}):(\d{{2}}):(\d{{2}})$",
+    re.IGNORECASE,
+)
+
+
+# Helper to parse a socrates start/stop date into a datetime.
+# NOTE: ValueError is raised if the date cannot be parsed.
+def _parse_socrates_date(date_str: str) -> datetime:
+    m = _socrates_date_pattern.match(date_str)
+    if not m:
+        raise ValueError(f"Invalid socrates date '{date_str}'")
+
+    year, month, day, hour, minute, second = m.groups()
+
+    return datetime(
+        int(year),
+        _months_dict[month.lower()],
+        int(day),
+        int(hour),
+        int(minute),
+        int(second),
+    )
 
 
 # Helper to download the orbit data used in the latest socrates run.
@@ -18,15 +79,17 @@ def _download_socrates_on_orbit() -> pl.DataFrame:
 
     # Download and parse the latest data.
     download_url = r"https://celestrak.org/pub/on-orbit.csv"
-    download_response = rq.get(download_url)
+    download_response = _session.get(download_url, timeout=_download_timeout)
+    # NOTE: the raw bytes of the response are passed directly to
+    # the polars CSV parser, without decoding them into a Python string.
     on_orbit = pl.read_csv(
-        StringIO(download_response.text),
+        download_response.content,
         # NOTE: most data in this column is '0', and polars
         # incorrectly infers an integral data type.
         schema_overrides={"MEAN_MOTION_DDOT": pl.Float64},
     )
 
-    # Rename the columns.
+    # Map used to rename the columns.
     rename_map = {
         "NORAD_CAT_ID": "norad_id",
         "MEAN_MOTION": "n0",
@@ -37,23 +100,38 @@ def _download_socrates_on_orbit() -> pl.DataFrame:
         "MEAN_ANOMALY": "m0",
         "BSTAR": "bstar",
     }
-    on_orbit = on_orbit.rename(rename_map)
 
     # Setup the epoch jd columns.
-    utc_dates = Time(on_orbit["EPOCH"], format="isot", scale="utc", precision=9)
-    on_orbit = on_orbit.with_columns(
-        pl.Series(name="epoch_jd1", values=utc_dates.jd1),
-        pl.Series(name="epoch_jd2", values=utc_dates.jd2),
+    # NOTE: the epochs are parsed into nanoseconds since the UNIX epoch, which
+    # are then split into a whole number of days (jd1, offset by the julian date
+    # of the UNIX epoch) and a day fraction (jd2). This is equivalent to parsing
+    # the epochs with astropy, but it is performed in a vectorised fashion.
+    ns_per_day = 86400 * 10**9
+    epoch_ns = (
+        pl.col("EPOCH")
+        .str.to_datetime(format="%Y-%m-%dT%H:%M:%S%.f", time_unit="ns")
+        .dt.epoch("ns")
     )
 
-    # Change units of measurement.
+    # Conversion factor from degrees to radians.
     deg2rad = 2.0 * np.pi / 360.0
-    on_orbit = on_orbit.with_columns(
-        n0=pl.col("n0") * (2.0 * np.pi / 1440.0),
-        i0=pl.col("i0") * deg2rad,
-        node0=pl.col("node0") * deg2rad,
-        omega0=pl.col("omega0") * deg2rad,
-        m0=pl.col("m0") * deg2rad,
+
+    # Rename the columns, add the epoch jd columns and change units of measurement.
+    # NOTE: all the new columns are computed in a single with_columns() block
+    # of a lazy query, so that polars can evaluate them in a single pass.
+    on_orbit = (
+        on_orbit.lazy()
+        .rename(rename_map)
+        .with_columns(
+            epoch_jd1=(epoch_ns // ns_per_day).cast(pl.Float64) + 2440587.5,
+            epoch_jd2=(epoch_ns % ns_per_day).cast(pl.Float64) / ns_per_day,
+            n0=pl.col("n0") * (2.0 * np.pi / 1440.0),
+            i0=pl.col("i0") * deg2rad,
+            node0=pl.col("node0") * deg2rad,
+            omega0=pl.col("omega0") * deg2rad,
+            m0=pl.col("m0") * deg2rad,
+        )
+        .collect()
     )
 
     logger.debug("Socrates on-orbit data successfully downloaded and parsed")
@@ -69,50 +147,43 @@ def _download_socrates_conjunctions() -> pl.DataFrame:
 
     # Download the conjunction data from socrates.
     download_url = r"https://celestrak.org/SOCRATES/sort-minRange.csv"
-    download_response = rq.get(download_url)
-    soc_df = pl.read_csv(StringIO(download_response.text))
-
-    # Ensure correct ordering of norad IDs.
-    soc_df = soc_df.with_columns(
-        norad_id_i=pl.when(pl.col("NORAD_CAT_ID_1") < pl.col("NORAD_CAT_ID_2"))
-        .then(pl.col("NORAD_CAT_ID_1"))
-        .otherwise(pl.col("NORAD_CAT_ID_2")),
-        norad_id_j=pl.when(pl.col("NORAD_CAT_ID_1") < pl.col("NORAD_CAT_ID_2"))
-        .then(pl.col("NORAD_CAT_ID_2"))
-        .otherwise(pl.col("NORAD_CAT_ID_1")),
-    )
-
-    # Rename.
-    soc_df = soc_df.with_columns(
-        pl.col("TCA").alias("tca"),
-        pl.col("TCA_RANGE").alias("dca"),
-        pl.col("TCA_RELATIVE_SPEED").alias("relative_speed"),
-    )
-
-    # Transform the tca column into datetime.
-    soc_df = soc_df.with_columns(
-        pl.col("tca")
-        # NOTE: parse with ms resolution from socrates, then cast
-        # to nanoseconds resolution.
-        .str.to_datetime(format="%Y-%m-%d %H:%M:%S.%3f", time_zone="UTC")
-        .cast(pl.Datetime("ns", "UTC"))
+    download_response = _session.get(download_url, timeout=_download_timeout)
+    # NOTE: only the columns we need are read, so that the
+    # CSV parser can skip parsing the other columns altogether.
+    soc_df = pl.read_csv(
+        download_response.content,
+        columns=[
+            "NORAD_CAT_ID_1",
+            "NORAD_CAT_ID_2",
+            "TCA",
+            "TCA_RANGE",
+            "TCA_RELATIVE_SPEED",
+        ],
     )
 
-    # Clean up.
-    soc_df = soc_df.drop(
-        "NORAD_CAT_ID_1",
-        "NORAD_CAT_ID_2",
-        "OBJECT_NAME_1",
-        "OBJECT_NAME_2",
-        "DSE_1",
-        "DSE_2",
-        "MAX_PROB",
-        "DILUTION",
-        "TCA",
-        "TCA_RANGE",
-        "TCA_RELATIVE_SPEED",
+    # Build the columns of the conjunctions dataframe.
+    # NOTE: all the columns are computed in a single select() block of a lazy
+    # query, so that polars can evaluate them in a single pass.
+    soc_df = (
+        soc_df.lazy()
+        .select(
+            # NOTE: ensure correct ordering of norad IDs.
+            norad_id_i=pl.min_horizontal("NORAD_CAT_ID_1", "NORAD_CAT_ID_2").cast(
+                pl.UInt64
+            ),
+            norad_id_j=pl.max_horizontal("NORAD_CAT_ID_1", "NORAD_CAT_ID_2").cast(
+                pl.UInt64
+            ),
+            # NOTE: parse with ms resolution from socrates, then cast
+            # to nanoseconds resolution.
+            tca=pl.col("TCA")
+            .str.to_datetime(format="%Y-%m-%d %H:%M:%S.%3f", time_zone="UTC")
+            .cast(pl.Datetime("ns", "UTC")),
+            dca=pl.col("TCA_RANGE"),
+            relative_speed=pl.col("TCA_RELATIVE_SPEED"),
+        )
+        .collect()
     )
-    soc_df = soc_df.cast({"norad_id_i": pl.UInt64, "norad_id_j": pl.UInt64})
 
     logger.debug("Socrates conjunctions data successfully downloaded and parsed")
 
@@ -127,91 +198,64 @@ def _determine_socrates_time_range() -> tuple[Time, Time]:
 
     # Download the 'search' web page.
     download_url = r"https://celestrak.org/SOCRATES/search.php"
-    download_response = rq.get(download_url)
+    download_response = _session.get(download_url, timeout=_download_timeout)
     socrates_search = download_response.text
 
     # We will be parsing the web page source code in order to infer the time range.
 
-    # Build a dictionary to associate a mont abbreviation to a number.
-    months_list = [
-        "Jan",
-        "Feb",
-        "Mar",
-        "Apr",
-        "May",
-        "Jun",
-        "Jul",
-        "Aug",
-        "Sep",
-        "Oct",
-        "Nov",
-        "Dec",
-    ]
-    months_dict = {_[1]: _[0] for _ in enumerate(months_list, start=1)}
-
-    # This is the line we are looking for. The start/stop dates are expected to be enclosed in the two groups.
+    # This is the text we are looking for. The start/stop dates are expected to be enclosed in the two groups.
+    # NOTE: the pattern is searched for in the whole web page in a single pass. As '.' does not
+    # match newlines, the two groups are guaranteed to be located on the same line.
     start_end_pattern = re.compile(
-        ".*Computation Interval: Start = (.*) UTC, Stop = (.*) UTC.*", re.IGNORECASE
+        r"Computation Interval: Start = (.+?) UTC, Stop = (.+?) UTC", re.IGNORECASE
     )
 
-    date_begin = None
-    date_end = None
     err_msg = (
         "Error detected while trying to determine the socrates start/stop time range"
     )
-    for ln in socrates_search.split("\n"):
-        m = start_end_pattern.match(ln)
-
-        if m:
-            # We found the line we were looking for. Now we need to parse the start/stop groups.
-            start_str, end_str = m.groups()
-            # NOTE: we are trying to parse dates in this format: "2025 Feb 10 08:00:00".
-            data_pattern = re.compile(
-                rf"^(\d{{4}}) ({'|'.join(months_list)}) (\d{{2}}) (\d{{2}}):(\d{{2}}):(\d{{2}})$",
-                re.IGNORECASE,
-            )
-
-            m_start = data_pattern.match(start_str)
-            m_end = data_pattern.match(end_str)
 
-            if not m_start or not m_end:
-                raise ValueError(err_msg)
-
-            # Convert the month abbreviations into numbers.
-            s_groups = list(m_start.groups())
-            e_groups = list(m_end.groups())
-            s_groups[1] = months_dict[s_groups[1]]
-            e_groups[1] = months_dict[e_groups[1]]
-
-            # Build start/stop times as astropy Time objects.
-            date_begin = Time(
-                f"{s_groups[0]}-{s_groups[1]}-{s_groups[2]} {s_groups[3]}:{s_groups[4]}:{s_groups[5]}",
-                format="iso",
-                scale="utc",
-                precision=9,
-            )
-            date_end = Time(
-                f"{e_groups[0]}-{e_groups[1]}-{e_groups[2]} {e_groups[3]}:{e_groups[4]}:{e_groups[5]}",
-                format="iso",
-                scale="utc",
-                precision=9,
-            )
-
-            logger.debug(
-                f"Socrates start/stop time range successfully determined: [{date_begin}, {date_end}]"
-            )
+    m = start_end_pattern.search(socrates_search)
+    if not m:
+        # NOTE: if we get here, it means that we did not find
+        # the text containing the start/stop dates.
+        raise ValueError(err_msg)
+
+    # We found the text we were looking for. Now we need to parse the start/stop groups.
+    # NOTE: we are trying to parse dates in this format: "2025 Feb 10 08:00:00".
+    start_str, end_str = m.groups()
+    try:
+        dt_start = _parse_socrates_date(start_str)
+        dt_end = _parse_socrates_date(end_str)
+    except ValueError as e:
+        raise ValueError(err_msg) from e
+
+    # Build start/stop times as astropy Time objects.
+    date_begin = Time(
+        dt_start.isoformat(sep=" "),
+        format="iso",
+        scale="utc",
+        precision=9,
+    )
+    date_end = Time(
+        dt_end.isoformat(sep=" "),
+        format="iso",
+        scale="utc",
+        precision=9,
+    )
 
-            return date_begin, date_end
+    logger.debug(
+        f"Socrates start/stop time range successfully determined: [{date_begin}, {date_end}]"
+    )
 
-    # NOTE: if we get here, it means that we did not find the line containing
-    # the start/stop dates.
-    raise ValueError(err_msg)
+    return date_begin, date_end
 
 
 # Initial setup of the mizuba conjunctions dataframe.
+# NOTE: the dataframe is returned as a lazy frame, which is
+# then augmented and merged lazily by the functions below.
 def _create_mz_conj_init(
     cj: mz.conjunctions, pj: mz.polyjectory, norad_ids: np.typing.NDArray[np.uint64]
-) -> pl.DataFrame:
+) -> pl.LazyFrame:
     # Fetch the array of conjunctions.
     conj = cj.conjunctions
 
@@ -219,22 +263,53 @@ def _create_mz_conj_init(
     norad_id_i = norad_ids[conj["i"]]
     norad_id_j = norad_ids[conj["j"]]
 
-    # Build the tca column, representing it as a ISO UTC
-    # string with ns resolution.
+    # Build the tca column, representing it as a UTC datetime with ns resolution.
+    # NOTE: the tcas are converted into UTC calendar dates and times via astropy's
+    # ymdhms representation, which is computed in a vectorised fashion. The datetimes
+    # are then assembled by polars, which avoids formatting the tcas as ISO strings
+    # and parsing them back.
     pj_epoch1, pj_epoch2 = pj.epoch
-    tca = Time(
+    tca_ymdhms = Time(
         val=pj_epoch1,
         val2=pj_epoch2 + conj["tca"],
         format="jd",
         scale="tai",
-        precision=9,
-    ).utc.iso
+    ).utc.ymdhms
+    # NOTE: split the seconds into whole seconds and nanoseconds.
+    tca_sec = np.floor(tca_ymdhms["second"])
+    tca = (
+        pl.DataFrame(
+            {
+                "year": tca_ymdhms["year"],
+                "month": tca_ymdhms["month"],
+                "day": tca_ymdhms["day"],
+                "hour": tca_ymdhms["hour"],
+                "minute": tca_ymdhms["minute"],
+                "second": tca_sec.astype(np.int64),
+                "ns": np.rint((tca_ymdhms["second"] - tca_sec) * 1e9).astype(np.int64),
+            }
+        )
+        .select(
+            pl.datetime("year", "month", "day", time_unit="ns", time_zone="UTC")
+            + pl.duration(
+                hours="hour",
+                minutes="minute",
+                seconds="second",
+                nanoseconds="ns",
+                time_unit="ns",
+            )
+        )
+        .to_series()
+    )
 
     # Build the dca column.
     dca = conj["dca"]
 
     # Build the relative speed column.
-    rel_speed = np.linalg.norm(conj["vi"] - conj["vj"], axis=1)
+    # NOTE: the squared norms of the velocity differences are computed
+    # via einsum(), which avoids the temporary array of squared components.
+    dv = conj["vi"] - conj["vj"]
+    rel_speed = np.sqrt(np.einsum("ij,ij->i", dv, dv))
 
     # Start assembling the dataframe.
     cdf = pl.DataFrame(
@@ -247,58 +322,50 @@ def _create_mz_conj_init(
         }
     )
 
-    # Transform the tca column into datetime.
-    cdf = cdf.with_columns(
-        pl.col("tca").str.to_datetime(format="%Y-%m-%d %H:%M:%S.%9f", time_zone="UTC")
-    )
+    # Flag the tca column as sorted if the conjunctions are in tca order.
+    # NOTE: the flag allows polars to skip sorting the mizuba conjunctions
+    # before the asof join. The order is checked (in linear time) rather
+    # than assumed, so that the join remains correct if it does not hold.
+    if cdf["tca"].is_sorted():
+        cdf = cdf.with_columns(pl.col("tca").set_sorted())
 
-    return cdf
+    return cdf.lazy()
 
 
 # Augment a mizuba conjunctions dataframe with data from the satcat.
 def _create_mz_conj_satcat_augment(
-    cdf: pl.DataFrame, satcat: pl.DataFrame
-) -> pl.DataFrame:
+    cdf: pl.LazyFrame, satcat: pl.DataFrame
+) -> pl.LazyFrame:
     # A helper to attach columns from satcat to the mizuba conjunctions
     # dataframe cdf. scols are the names of the target satcat columns, ocols
     # are the prefix names of the new columns that will be attached to the conjunctions
     # dataframe, null_fills the null fill values for the new columns.
     def attach_columns(
-        cdf: pl.DataFrame, scols: list[str], ocols: list[str], null_fills: list[Any]
-    ) -> pl.DataFrame:
+        cdf: pl.LazyFrame, scols: list[str], ocols: list[str], null_fills: list[Any]
+    ) -> pl.LazyFrame:
         assert len(scols) == len(ocols)
         assert len(scols) == len(null_fills)
 
-        cdf = (
-            cdf.join(
-                satcat.select(["NORAD_CAT_ID", *scols]),
-                how="left",
-                left_on="norad_id_i",
-                right_on="NORAD_CAT_ID",
-            )
-            .with_columns(
-                [
-                    pl.col(scol).fill_null(pl.lit(null_fill)).alias(f"{ocol}_i")
-                    for scol, null_fill, ocol in zip(scols, null_fills, ocols)
-                ]
-            )
-            .drop(*scols)
-        )
-        cdf = (
-            cdf.join(
-                satcat.select(["NORAD_CAT_ID", *scols]),
+        # Select the target columns from the satcat.
+        # NOTE: this is done only once, as the selection
+        # is shared by the joins for the two objects.
+        sc = satcat.lazy().select("NORAD_CAT_ID", *scols)
+
+        # NOTE: the target columns are renamed directly in the satcat
+        # selection, so that no renaming is needed after each join.
+        for sfx in ("i", "j"):
+            cdf = cdf.join(
+                sc.rename({scol: f"{ocol}_{sfx}" for scol, ocol in zip(scols, ocols)}),
                 how="left",
-                left_on="norad_id_j",
+                left_on=f"norad_id_{sfx}",
                 right_on="NORAD_CAT_ID",
-            )
-            .with_columns(
+            ).with_columns(
                 [
-                    pl.col(scol).fill_null(pl.lit(null_fill)).alias(f"{ocol}_j")
-                    for scol, null_fill, ocol in zip(scols, null_fills, ocols)
+                    pl.col(f"{ocol}_{sfx}").fill_null(pl.lit(null_fill))
+                    for null_fill, ocol in zip(null_fills, ocols)
                 ]
             )
-            .drop(*scols)
-        )
+
         return cdf
 
     # Attach several columns from the satcat.
@@ -322,25 +389,35 @@ def _create_mz_conj_satcat_augment(
 
 
 # Create a dataframe merging the results of mizuba's and socrates' conjunction detection.
+# NOTE: cdf is a lazy frame, and the whole pipeline building the merged
+# dataframe (including the satcat augmentation) is collected here at once.
 def _create_mz_conj_merged(
-    cdf: pl.DataFrame, soc_df: pl.DataFrame
+    cdf: pl.LazyFrame, soc_df: pl.DataFrame
 ) -> tuple[int, pl.DataFrame]:
     # Construct the joined dataframe. This will match all the conjunctions
     # detected by socrates to corresponding conjunctions detected by mizuba.
     #
     # NOTE: the check_sortedness=True argument should be used as a sanity check,
     # but currently it is disabled if the "by" argument is also specified
-    cdf = soc_df.sort("tca").join_asof(
-        cdf.sort("tca"),
-        by=["norad_id_i", "norad_id_j"],
-        on="tca",
-        strategy="nearest",
-        coalesce=False,
-        check_sortedness=False,
+    # NOTE: the socrates conjunctions are downloaded sorted by minimum range,
+    # thus they must be sorted by tca here. The sort of the mizuba conjunctions
+    # is instead skipped by polars if the tca column is flagged as sorted
+    # (see _create_mz_conj_init()).
+    cdf = (
+        soc_df.lazy()
+        .sort("tca")
+        .join_asof(
+            cdf.sort("tca"),
+            by=["norad_id_i", "norad_id_j"],
+            on="tca",
+            strategy="nearest",
+            coalesce=False,
+            check_sortedness=False,
+        )
     )
 
-    # Determine the number of missed conjunctions (hopefully zero).
-    n_missed_conj = cdf.select(pl.col("tca_right").is_null().sum()).item()
+    # Build the query for the number of missed conjunctions (hopefully zero).
+    n_missed_conj_lf = cdf.select(pl.col("tca_right").is_null().sum())
 
     # Drop the missed conjunctions. If we do not do this, we will have issues
     # because the dataframe will contain null values.
@@ -349,11 +426,13 @@ def _create_mz_conj_merged(
     # Add columns with tca, dca and relative speed differences between
     # mizuba and socrates.
     cdf = cdf.with_columns(
+        # NOTE: the tca difference is computed via integer arithmetic
+        # on the nanoseconds since the UNIX epoch, and it is converted
+        # to a floating-point value (in ms) only at the end.
         (
-            (pl.col("tca") - pl.col("tca_right"))
+            (pl.col("tca").dt.epoch("ns") - pl.col("tca_right").dt.epoch("ns"))
             .abs()
-            .cast(pl.Duration("ns"))
-            .cast(float)
+            .cast(pl.Float64)
             / 1e6
         ).alias("tca_diff"),
         ((pl.col("dca") - pl.col("dca_right")) * 1000.0).abs().alias("dca_diff"),
@@ -369,6 +448,45 @@ def _create_mz_conj_merged(
         pl.col("relative_speed_right").alias("relative_speed"),
     ).drop("tca_right", "dca_right", "relative_speed_right")
 
+    # Downcast the norad IDs, the conjunction distances and speeds and their differences.
+    # NOTE: norad IDs fit comfortably in 32 bits, and single precision is more than
+    # enough for distances/speeds (and differences) which are displayed with 4
+    # significant digits. Halving the size of these columns reduces the memory
+    # footprint of the conjunctions dataframe and speeds up filtering and sorting.
+    cdf = cdf.cast(
+        {
+            "norad_id_i": pl.UInt32,
+            "norad_id_j": pl.UInt32,
+            "dca": pl.Float32,
+            "relative_speed": pl.Float32,
+            "tca_diff": pl.Float32,
+            "dca_diff": pl.Float32,
+            "relative_speed_diff": pl.Float32,
+        }
+    )
+
+    # Add the columns which are displayed in the frontend in place of
+    # the individual norad IDs and object names, and the tca as a UTC ISO
+    # string with ms precision. Add also lowercase versions of the object
+    # names, which are used to implement case-insensitive filtering on the
+    # object names. Computing these columns here avoids having to compute
+    # them at every request.
+    cdf = cdf.with_columns(
+        pl.concat_str(
+            pl.col("norad_id_i").cast(str),
+            pl.col("norad_id_j").cast(str),
+            separator=" | ",
+        ).alias("norad_ids"),
+        pl.concat_str(
+            pl.col("object_name_i"),
+            pl.col("object_name_j"),
+            separator=" | ",
+        ).alias("object_names"),
+        pl.col("tca").dt.strftime("%Y-%m-%d %H:%M:%S.%3f").alias("tca_str"),
+        pl.col("object_name_i").str.to_lowercase().alias("object_name_lc_i"),
+        pl.col("object_name_j").str.to_lowercase().alias("object_name_lc_j"),
+    )
+
     # Reorder the columns.
     cdf = cdf.select(
         "norad_id_i",
@@ -391,9 +509,19 @@ def _create_mz_conj_merged(
         "tca_diff",
         "dca_diff",
         "relative_speed_diff",
+        "norad_ids",
+        "object_names",
+        "tca_str",
+        "object_name_lc_i",
+        "object_name_lc_j",
     )
 
-    return n_missed_conj, cdf
+    # Collect the number of missed conjunctions together with the merged dataframe.
+    # NOTE: collecting both queries at once allows polars to evaluate
+    # the joins (which are common to both queries) only once.
+    n_missed_conj_df, cdf_coll = pl.collect_all([n_missed_conj_lf, cdf])
+
+    return n_missed_conj_df.item(), cdf_coll
 
 
 # Helper to construct a conjunctions dataframe from the results of mizuba's
@@ -424,12 +552,21 @@ def _create_new_conj(
 
     logger = logging.getLogger("arroyo")
 
-    # Fetch the data from celestrak.
+    # Start downloading the satcat in the background.
+    # NOTE: the satcat is needed only after conjunction detection. Thus, we do not
+    # wait for its download to complete before building the polyjectory and running
+    # conjunction detection, so that the download overlaps with the computation.
+    # NOTE: shutting down the executor without waiting lets the download
+    # complete in the background, after which the worker thread exits.
+    satcat_executor = ThreadPoolExecutor(max_workers=1)
+    satcat_fut = satcat_executor.submit(mz.data_sources.download_satcat_celestrak)
+    satcat_executor.shutdown(wait=False)
+
+    # Fetch the rest of the data from celestrak.
     with ThreadPoolExecutor() as executor:
         soc_df_fut = executor.submit(_download_socrates_conjunctions)
         on_orbit_fut = executor.submit(_download_socrates_on_orbit)
         time_range_fut = executor.submit(_determine_socrates_time_range)
-        satcat_fut = executor.submit(mz.data_sources.download_satcat_celestrak)
     soc_df = soc_df_fut.result()
     on_orbit = on_orbit_fut.result()
     date_begin, date_end = time_range_fut.result()
@@ -442,14 +579,23 @@ def _create_new_conj(
         raise ValueError(
             f"Inconsistent socrates data: conjunctions outside the expected range [{date_begin}, {date_end}] were detected"
         )
+    # NOTE: the norad IDs of both objects are checked in a single
+    # membership test, so that the on-orbit norad IDs are hashed only once.
     if (
-        not soc_df["norad_id_i"].is_in(on_orbit["norad_id"]).all()
-        or not soc_df["norad_id_j"].is_in(on_orbit["norad_id"]).all()
+        not pl.concat([soc_df["norad_id_i"], soc_df["norad_id_j"]])
+        .is_in(on_orbit["norad_id"].implode())
+        .all()
     ):
         raise ValueError(
             "Inconsistent socrates data: conjunctions involving objects not present in the on-orbit data were detected"
         )
 
+    # NOTE: if the satcat download has already failed, we raise the error
+    # here (via result()) instead of after the expensive polyjectory
+    # construction and conjunction detection steps.
+    if satcat_fut.done():
+        satcat_fut.result()
+
     logger.debug("Building the polyjectory")
 
     # Build the polyjectory, using the cache dir as tmpdir and making
@@ -463,6 +609,10 @@ def _create_new_conj(
 
     logger.debug(f"New polyjectory built with data dir '{pj.data_dir}'")
 
+    # Check again for a failed satcat download before conjunction detection.
+    if satcat_fut.done():
+        satcat_fut.result()
+
     logger.debug("Running conjunction detection")
 
     # Run conjunction detection.
@@ -3,14 +3,18 @@ import threading
 import pathlib
 import logging
 import os
-from dataclasses import dataclass, field
+import time
+from dataclasses import dataclass, field, fields
 import pickle
 from astropy.time import Time  # type: ignore
 from ._create_new_conj import _create_new_conj
 import weakref
+import uuid
+import gc
 import shutil
 import mizuba as mz  # type: ignore
 import numpy as np
+from typing import Sequence, Hashable
 
 # Determine the absolute path to the cache dir.
 _cache_dir = (pathlib.Path(__file__).parent / "cache").resolve()
@@ -20,11 +24,38 @@ assert _cache_dir.is_dir()
 # Build the path to the pickled conjunctions data in the cache.
 _cd_path = _cache_dir / "cd.pickle"
 
+# The prefix of the files (within the cache dir) storing the
+# conjunctions dataframe and the norad IDs array.
+# NOTE: the conjunctions dataframe and the norad IDs array are not pickled
+# together with the rest of the conjunctions data, rather they are stored
+# separately in uncompressed Arrow IPC and .npy formats. This allows us to
+# memory-map them when loading them from the cache.
+# NOTE: the names of these files contain a generation token, which is unique
+# to each save and which is recorded in the pickled conjunctions data. Thus,
+# the pickled conjunctions data always points to the data files that were saved
+# together with it, and the data files currently in use (and possibly memory-mapped)
+# are never overwritten. The data files of old generations are removed during
+# the cache cleanup.
+_cd_data_prefix = "cd_data_"
+
+
+# Helper to build the path to the conjunctions dataframe
+# of the cache generation gen.
+def _cd_df_path(gen: str) -> pathlib.Path:
+    return _cache_dir / f"{_cd_data_prefix}{gen}.arrow"
+
+
+# Helper to build the path to the norad IDs array
+# of the cache generation gen.
+def _cd_norad_ids_path(gen: str) -> pathlib.Path:
+    return _cache_dir / f"{_cd_data_prefix}{gen}_norad_ids.npy"
+
+
 # The conjunctions dataframe schema.
 _conj_df_schema = pl.Schema(
     [
-        ("norad_id_i", pl.UInt64),
-        ("norad_id_j", pl.UInt64),
+        ("norad_id_i", pl.UInt32),
+        ("norad_id_j", pl.UInt32),
         ("object_name_i", pl.String),
         ("object_name_j", pl.String),
         ("ops_status_i", pl.String),
@@ -38,19 +69,37 @@ _conj_df_schema = pl.Schema(
         ("rcs_i", pl.Float64),
         ("rcs_j", pl.Float64),
         ("tca", pl.Datetime(time_unit="ns", time_zone="UTC")),
-        ("dca", pl.Float64),
-        ("relative_speed", pl.Float64),
-        ("tca_diff", pl.Float64),
-        ("dca_diff", pl.Float64),
-        ("relative_speed_diff", pl.Float64),
+        ("dca", pl.Float32),
+        ("relative_speed", pl.Float32),
+        ("tca_diff", pl.Float32),
+        ("dca_diff", pl.Float32),
+        ("relative_speed_diff", pl.Float32),
+        # NOTE: norad IDs and object names of the two
+        # objects, compressed into single string columns
+        # for display.
+        ("norad_ids", pl.String),
+        ("object_names", pl.String),
+        # NOTE: the tca as a UTC ISO string
+        # with ms precision, for display.
+        ("tca_str", pl.String),
+        # NOTE: lowercase versions of the object names,
+        # used for case-insensitive filtering.
+        ("object_name_lc_i", pl.String),
+        ("object_name_lc_j", pl.String),
     ]
 )
 
+# Empty conjunctions dataframe, used as default value in the conjunctions data class.
+# NOTE: the dataframe is never modified in place, thus a single instance can be shared
+# by all the default-constructed instances of the conjunctions data class.
+_empty_conj_df = pl.DataFrame([], schema=_conj_df_schema)
+
 
 # Current version of the conjunctions data class.
 # NOTE: this needs to be bumped when the conjunctions data class changes.
-# This also includes changes in _conj_df_schema.
-_cd_cur_version = 8
+# This also includes changes in _conj_df_schema and in the on-disk format
+# of the cached conjunctions data.
+_cd_cur_version = 16
 
 
 # Conjunctions data class. This is the class that holds the results of
@@ -61,9 +110,7 @@ class conjunction_data:
     # Version of the class.
     version: int = _cd_cur_version
     # The conjunctions dataframe.
-    df: pl.DataFrame = field(
-        default_factory=lambda: pl.DataFrame([], schema=_conj_df_schema)
-    )
+    df: pl.DataFrame = field(default_factory=lambda: _empty_conj_df)
     # The conjunction threshold (in km).
     threshold: float = 0
     # The number of missed conjunctions wrt socrates.
@@ -83,6 +130,10 @@ class conjunction_data:
     # The list of norad IDs for the polyjectory that
     # was used during conjunction detection.
     norad_ids: np.typing.NDArray[np.uint64] | None = None
+    # The generation of the data files storing the
+    # conjunctions dataframe and the norad IDs array
+    # in the cache (None if not saved in the cache).
+    cache_gen: str | None = None
 
 
 # The prefix of the directories (within the cache dir)
@@ -90,20 +141,106 @@ class conjunction_data:
 _pj_data_prefix = "mizuba_polyjectory"
 
 
-# Global conjunctions data, protected for multithreaded access.
-_conj_lock = threading.Lock()
+# Helper to save conjunctions data into the cache.
+# NOTE: the saved conjunctions data can be loaded back via _load_conjunction_data().
+def _save_conjunction_data(cdata: conjunction_data) -> None:
+    # Generate a new cache generation token.
+    gen = uuid.uuid4().hex
+
+    # Write the dataframe.
+    cdata.df.write_ipc(_cd_df_path(gen), compression="uncompressed")
+
+    # Write the norad IDs array.
+    # NOTE: np.save() is invoked on a file object, as it would otherwise
+    # append the .npy extension to the file name if missing.
+    assert cdata.norad_ids is not None
+    with open(_cd_norad_ids_path(gen), "wb") as f:
+        np.save(f, cdata.norad_ids)
+
+    # Pickle the other members of the data class, including the generation token.
+    # NOTE: _cd_path is written last because its mtime is used to establish
+    # the age of the cached conjunctions data.
+    # NOTE: the pickled data is written into a temporary file which is then moved
+    # into place. Thus, _cd_path always contains either the old or the new pickled
+    # data in its entirety, each pointing to the data files of its own generation,
+    # even if the process is interrupted while saving.
+    meta = {
+        _.name: getattr(cdata, _.name)
+        for _ in fields(cdata)
+        if _.name not in ("df", "norad_ids")
+    } | {"cache_gen": gen}
+    # NOTE: if writing or moving the temporary file fails, we remove it
+    # so that it is not left behind in the cache dir.
+    tmp_cd_path = _cd_path.with_name(_cd_path.name + ".tmp")
+    try:
+        with open(tmp_cd_path, "wb") as f:
+            pickle.dump(meta, f, protocol=5)
+        os.replace(tmp_cd_path, _cd_path)
+    except Exception:
+        tmp_cd_path.unlink(missing_ok=True)
+        raise
+
+
+# Helper to load conjunctions data from the cache.
+def _load_conjunction_data() -> conjunction_data:
+    with open(_cd_path, "rb") as f:
+        meta = pickle.load(f)
+
+    # Check the version of the data class.
+    if not isinstance(meta, dict) or meta.get("version") != _cd_cur_version:
+        raise ValueError(
+            f"Invalid existing conjunctions data detected during unpickling: the expected version is {_cd_cur_version}"
+        )
+
+    # Fetch the generation of the data files, and check that
+    # the data files of this generation are present.
+    gen = meta.get("cache_gen")
+    if (
+        not isinstance(gen, str)
+        or not _cd_df_path(gen).is_file()
+        or not _cd_norad_ids_path(gen).is_file()
+    ):
+        raise ValueError(
+            f"Invalid existing conjunctions data detected: the data files for the cache generation '{gen}' are missing"
+        )
+
+    # Check the schema of the dataframe.
+    # NOTE: the schema is read from the IPC file footer,
+    # without touching the column data.
+    if pl.read_ipc_schema(_cd_df_path(gen)) != dict(_conj_df_schema):
+        raise ValueError(
+            "Invalid existing conjunctions dataframe detected: the schema does not match the expected schema"
+        )
+
+    # Memory-map the dataframe.
+    df = pl.read_ipc(_cd_df_path(gen), memory_map=True)
+
+    # Memory-map the norad IDs array.
+    norad_ids = np.load(_cd_norad_ids_path(gen), mmap_mode="r")
+    if norad_ids.dtype != np.uint64 or norad_ids.ndim != 1:
+        raise ValueError(
+            "Invalid existing norad IDs array detected: the expected array is one-dimensional with dtype uint64"
+        )
+
+    return conjunction_data(df=df, norad_ids=norad_ids, **meta)
+
+
+# Global conjunctions data.
 # NOTE: conjunctions data and pj are stored packed in a tuple.
 # The intent here is to promote atomicity during updates via
 # _set_conjunctions().
 # NOTE: if needed, we could think about introducing an ad-hoc
 # dataclass here instead of the tuple.
+# NOTE: no lock is needed for multithreaded access: the tuple is never
+# modified in place, it is only ever replaced as a whole via the (atomic)
+# rebinding of _conj_data in _set_conjunctions(). Readers thus always see
+# either the old or the new tuple.
 _conj_data = (conjunction_data(), None)
 
 
 # Thread-safe getter for the conjunctions data.
 def _get_conjunctions() -> tuple[conjunction_data, mz.polyjectory | None]:
-    with _conj_lock:
-        return _conj_data
+    return _conj_data
 
 
 # Thread-safe setter for the conjunctions data.
@@ -111,16 +248,119 @@ def _set_conjunctions(new_conj: conjunction_data, new_pj: mz.polyjectory) -> Non
     global _conj_data
 
     # NOTE: the point of creating a new tuple and then assigning
-    # it while holding the lock is that this will translate to a single
-    # assignment instruction in the Python bytecode. This should hopefully be
-    # a single atomic operation, whereas if we managed the two members of the
-    # tuple independently we could in principle end up in a situation in which
-    # the first assignment succeeds but the second fails, leaving the in-memory
-    # data in an inconsistent state.
-    new_conj_data = (new_conj, new_pj)
-
-    with _conj_lock:
-        _conj_data = new_conj_data
+    # it is that this will translate to a single assignment instruction
+    # in the Python bytecode, which is an atomic operation. If we managed
+    # the two members of the tuple independently, readers could in principle
+    # observe a situation in which the first assignment succeeded but the
+    # second one did not, that is, inconsistent in-memory data.
+    #
+    # NOTE: the caches of sorting permutations and row counts are cleared while
+    # holding their locks, and the new conjunctions data is assigned within the
+    # same critical section. This way, requests which were in flight during the
+    # update cannot insert entries referring to the old conjunctions data after
+    # the clearing.
+    with _sort_perm_cache_lock, _tot_nrows_cache_lock:
+        _conj_data = (new_conj, new_pj)
+        _sort_perm_cache.clear()
+        _tot_nrows_cache.clear()
+
+
+# Cache of sorting permutations for the conjunctions dataframe. The keys are the
+# sorting criteria (i.e., the column names and the descending flags), the values are
+# the conjunctions data and the permutation which sorts its dataframe according
+# to the sorting criteria.
+# NOTE: the conjunctions dataframe does not change between updates, and thus
+# the sorting permutations can be computed once and then reused for all requests
+# which do not involve filtering. Storing a permutation rather than a sorted copy
+# of the dataframe keeps the memory cost of each cache entry low.
+_sort_perm_cache: dict[
+    tuple[tuple[str, ...], tuple[bool, ...]], tuple[conjunction_data, pl.Series]
+] = {}
+# Maximum number of entries in the cache.
+_sort_perm_cache_max_size = 16
+# Lock used to serialise insertions into and clearing of the cache.
+_sort_perm_cache_lock = threading.Lock()
+
+
+# Thread-safe getter for the permutation sorting the dataframe
+# of the conjunctions data cdata according to the sorting criteria.
+def _get_sort_permutation(
+    cdata: conjunction_data, sort_cols: Sequence[str], desc: Sequence[bool]
+) -> pl.Series:
+    key = (tuple(sort_cols), tuple(desc))
+
+    # NOTE: the cache may be concurrently cleared by _set_conjunctions(),
+    # and it may contain entries computed on outdated conjunctions data
+    # by requests which were in flight during an update. Thus, we check
+    # that the cached permutation refers to cdata.
+    entry = _sort_perm_cache.get(key)
+    if entry is not None and entry[0] is cdata:
+        return entry[1]
+
+    # Compute the permutation.
+    perm = cdata.df.select(pl.arg_sort_by(sort_cols, descending=desc)).to_series()
+
+    with _sort_perm_cache_lock:
+        # NOTE: if the conjunctions data was updated while we were computing
+        # the permutation, we do not insert it into the cache, otherwise
+        # the entry would keep the outdated conjunctions data alive.
+        if cdata is _conj_data[0]:
+            # Evict the oldest entry if the cache is full.
+            if key not in _sort_perm_cache and (
+                len(_sort_perm_cache) >= _sort_perm_cache_max_size
+            ):
+                oldest = next(iter(_sort_perm_cache), None)
+                if oldest is not None:
+                    del _sort_perm_cache[oldest]
+
+            _sort_perm_cache[key] = (cdata, perm)
+
+    return perm
+
+
+# Cache of the total number of rows surviving filtering. The keys are normalised
+# representations of the filters (see _filters_key()), the values are the conjunctions
+# data and the number of rows in its dataframe which survive filtering.
+# NOTE: while paginating through a filtered table, the frontend sends many requests
+# with the same filters. Caching the row counts allows us to collect only the requested
+# rows for all but the first of these requests. The saving is modest, as the count
+# query shares the filtered subplan with the rows query when they are collected together.
+_tot_nrows_cache: dict[Hashable, tuple[conjunction_data, int]] = {}
+# Maximum number of entries in the cache.
+_tot_nrows_cache_max_size = 256
+# Lock used to serialise insertions into and clearing of the cache.
+_tot_nrows_cache_lock = threading.Lock()
+
+
+# Thread-safe getter for the cached number of rows of the dataframe
+# of the conjunctions data cdata surviving the filters identified by key.
+# If no such number has been cached, None will be returned.
+def _get_tot_nrows(cdata: conjunction_data, key: Hashable) -> int | None:
+    # NOTE: like in _get_sort_permutation(), we must check
+    # that the cached entry refers to cdata.
+    entry = _tot_nrows_cache.get(key)
+    if entry is not None and entry[0] is cdata:
+        return entry[1]
+
+    return None
+
+
+# Thread-safe setter for the cached number of rows of the dataframe
+# of the conjunctions data cdata surviving the filters identified by key.
+def _set_tot_nrows(cdata: conjunction_data, key: Hashable, tot_nrows: int) -> None:
+    with _tot_nrows_cache_lock:
+        # NOTE: like in _get_sort_permutation(), we do not insert
+        # row counts computed on outdated conjunctions data.
+        if cdata is _conj_data[0]:
+            # Evict the oldest entry if the cache is full.
+            if key not in _tot_nrows_cache and (
+                len(_tot_nrows_cache) >= _tot_nrows_cache_max_size
+            ):
+                oldest = next(iter(_tot_nrows_cache), None)
+                if oldest is not None:
+                    del _tot_nrows_cache[oldest]
+
+            _tot_nrows_cache[key] = (cdata, tot_nrows)
 
 
 # The data processor thread.
@@ -141,14 +381,7 @@ class _data_processor(threading.Thread):
             )
 
             try:
-                with open(_cd_path, "rb") as f:
-                    ret: conjunction_data = pickle.load(f)
-
-                # Check the version of the data class.
-                if ret.version != _cd_cur_version:
-                    raise ValueError(
-                        f"Invalid existing conjunctions data version detected during unpickling: the version in the archive is {ret.version} but the expected version is {_cd_cur_version}"
-                    )
+                ret = _load_conjunction_data()
                 assert ret.pj_dir_name is not None
 
                 # Try to mount a polyjectory on ret.pj_dir_name.
@@ -169,6 +402,8 @@ class _data_processor(threading.Thread):
                 )
 
                 # Delete the existing conjunctions data.
+                # NOTE: the data files will be removed
+                # during the first cache cleanup.
                 _cd_path.unlink()
 
                 return conjunction_data(), None
@@ -203,6 +438,11 @@ class _data_processor(threading.Thread):
         if cur_pj is not None:
             self._pj_archive.append((weakref.ref(cur_pj), cur_pj.data_dir))
 
+        # The modification time of the conjunctions data file, as recorded
+        # after the last successful save. None signals that the modification
+        # time must be fetched from disk (e.g., at startup or after an error).
+        self._cd_mtime: float | None = None
+
     def _cache_pj_cleanup(self) -> None:
         # This is a method to cleanup old/invalid polyjectory data in the cache.
         # Old data results from replacing an existing polyjectory with a new one
@@ -214,6 +454,13 @@ class _data_processor(threading.Thread):
 
         logger.debug("Cache cleanup started")
 
+        # Run a garbage collection pass before checking the polyjectories.
+        # NOTE: expired polyjectories may still be kept alive by reference cycles
+        # (e.g., via the tracebacks of exceptions caught in the main loop).
+        # Collecting them here lets us remove their data right away, rather than
+        # at the next cleanup after the cyclic garbage collector eventually runs.
+        gc.collect()
+
         # As a first step, we iterate over the polyjectories in the archive
         # and we remove the corresponding dir if the polyjectory is expired.
         new_pj_archive: list[tuple[weakref.ref[mz.polyjectory], pathlib.Path]] = []
@@ -235,6 +482,18 @@ class _data_processor(threading.Thread):
         # Build a set out of the paths in the new archive.
         pj_path_set = set(_[1] for _ in self._pj_archive)
 
+        # Build a set out of the paths of the conjunctions data files
+        # in use, that is, the data files of the cache generation of
+        # the in-memory conjunctions data.
+        # NOTE: the pickled conjunctions data in the cache, if present,
+        # always refers to the same generation as the in-memory data.
+        cur_gen = _get_conjunctions()[0].cache_gen
+        cd_data_path_set = (
+            set()
+            if cur_gen is None
+            else {_cd_df_path(cur_gen), _cd_norad_ids_path(cur_gen)}
+        )
+
         # As a second step, we iterate over the contents of the cache dir, looking for
         # polyjectory dirs not appearing in pj_path_set. This can happen if an exception
         # was thrown in the main loop after the creation of a new polyjectory - the new
@@ -243,6 +502,27 @@ class _data_processor(threading.Thread):
             # Make extra sure we are operating on a fully-resolved path.
             cur_dir = cur_dir.resolve()
 
+            if cur_dir.is_file() and cur_dir.parts[-1].startswith(_cd_data_prefix):
+                # Conjunctions data file, remove it if it does not
+                # belong to the generation currently in use.
+                if cur_dir not in cd_data_path_set:
+                    logger.debug(
+                        f"Removing conjunctions data file not in use at the path '{cur_dir}'"
+                    )
+
+                    # NOTE: the file may still be memory-mapped (e.g., if a request
+                    # is still using old conjunctions data). On some platforms (e.g.,
+                    # Windows) deletion will then fail. If this happens, log and ignore
+                    # the error, we will try again next time.
+                    try:
+                        cur_dir.unlink()
+                    except Exception:
+                        logger.debug(
+                            f"Could not remove the conjunctions data file '{cur_dir}' - will try again next time"
+                        )
+
+                continue
+
             if not cur_dir.is_dir():
                 # Not a directory, skip it.
                 continue
@@ -295,12 +575,19 @@ class _data_processor(threading.Thread):
             try:
                 # As a first step, we must determine if the current cached
                 # data (if existing) is fresh enough.
-                conj_age = None
-                if _cd_path.exists():
-                    # The conjunctions data file exists, fetch its modification time
-                    # and determine its age in seconds.
-                    conj_mtime = Time(val=os.path.getmtime(_cd_path), format="unix")
-                    conj_age = (Time.now() - conj_mtime).to_value("s")
+                # NOTE: if the conjunctions data file exists, we fetch its modification
+                # time and determine its age in seconds. A single stat() call is used
+                # both to check for existence and to fetch the modification time.
+                # NOTE: the stat() call is skipped if the modification time was recorded
+                # after the last successful save, as this thread is the only writer
+                # of the conjunctions data file.
+                if self._cd_mtime is None:
+                    try:
+                        conj_age = time.time() - os.stat(_cd_path).st_mtime
+                    except FileNotFoundError:
+                        conj_age = None
+                else:
+                    conj_age = time.time() - self._cd_mtime
 
                 if conj_age and conj_age < MAX_AGE:
                     # The existing conjunctions data is fresh enough, go to sleep
@@ -393,13 +680,21 @@ class _data_processor(threading.Thread):
                 # In other words, the goal is to achieve consistency between the conjunctions
                 # data saved to disk and the in-memory conjunctions data.
                 try:
-                    with open(_cd_path, "wb") as f:
-                        pickle.dump(cdata, f)
+                    _save_conjunction_data(cdata)
 
                     logger.debug(
                         f"New conjunctions data successfully saved into the cache at '{_cd_path}'"
                     )
 
+                    # Replace the freshly-computed conjunctions data with its memory-mapped
+                    # version from the cache.
+                    # NOTE: this releases the heap memory of the freshly-computed dataframe,
+                    # and it lets the OS back the in-memory conjunctions dataframe with the
+                    # page cache, which is shared among all processes mapping the cache file.
+                    # NOTE: make sure we delete df in order to avoid holding a reference to it.
+                    cdata = _load_conjunction_data()
+                    del df
+
                     # Register the new polyjectory in the archive.
                     self._pj_archive.append((weakref.ref(pj), pj.data_dir))
 
@@ -407,8 +702,14 @@ class _data_processor(threading.Thread):
                     # NOTE: normally this should trigger the old pj ref to die, unless
                     # someone else is holding a reference to it.
                     _set_conjunctions(cdata, pj)
+
+                    # Record the modification time of the conjunctions data file.
+                    self._cd_mtime = os.stat(_cd_path).st_mtime
                 except Exception:
                     # NOTE: _cd_path could be missing, ignore errors if it is.
+                    # NOTE: the data files (if any) will be removed during the
+                    # next cache cleanup, as they do not belong to the cache
+                    # generation of the in-memory conjunctions data.
                     _cd_path.unlink(missing_ok=True)
 
                     # NOTE: at this point, we have polyjectory data written to disk
@@ -432,6 +733,11 @@ class _data_processor(threading.Thread):
                 # NOTE: successful loop iteration, reset retry_delay.
                 retry_delay = INIT_RETRY_DELAY
             except Exception:
+                # NOTE: the state of the conjunctions data file is unknown
+                # after an error, fetch its modification time from disk
+                # at the next iteration.
+                self._cd_mtime = None
+
                 logger.error(
                     f"Exception caught in the data processor thread, re-trying in {retry_delay} seconds",
                     exc_info=True,
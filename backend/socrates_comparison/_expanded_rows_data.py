@@ -4,16 +4,22 @@ import polars as pl
 import numpy as np
 
 
+# The dtype of the expanded rows data: for each row, a list
+# of data points consisting of a date and a mutual distance.
+_expanded_data_dtype = pl.List(pl.Struct({"date": pl.String, "dist": pl.Float64}))
+
+
 # Function to compute the data to be displayed when the rows are expanded.
+# NOTE: the data is returned as a series, with one element per row in df.
 def _compute_expanded_rows_data(
     pj: mz.polyjectory | None,
     cdata: conjunction_data,
     df: pl.DataFrame,
-) -> list[list[dict[str, float]]]:
+) -> pl.Series:
     # Exit early if there's no polyjectory (i.e., we have
     # no conjunctions data).
     if pj is None:
-        return []
+        return pl.Series("expanded_data", [], dtype=_expanded_data_dtype)
 
     # If pj is not None, the content of cdata must also be not None.
     assert cdata.norad_ids is not None
@@ -26,97 +32,88 @@ def _compute_expanded_rows_data(
     pj_id_i = np.searchsorted(cdata.norad_ids, norad_id_i).astype(np.uintp)
     pj_id_j = np.searchsorted(cdata.norad_ids, norad_id_j).astype(np.uintp)
 
-    # Convert the date_begin/date_end strings into a polars datetime dataframe with nanoseconds precision.
+    # Convert the date_begin/date_end strings into nanoseconds since the UNIX epoch.
     # The intent here is to perform time calculations without involving the Python datetime module.
     # NOTE: date_begin is also by definition the epoch of the polyjectory.
-    date_df = pl.DataFrame(
-        {"date_begin": cdata.date_begin, "date_end": cdata.date_end}
-    ).with_columns(
-        pl.col("date_begin")
-        # NOTE: here we know that the precision of the begin/end datetimes
-        # is seconds, as we enforce it in the data processing thread.
-        .str.to_datetime(format="%Y-%m-%d %H:%M:%S", time_zone="UTC")
-        .cast(pl.Datetime("ns", "UTC")),
-        pl.col("date_end")
-        .str.to_datetime(format="%Y-%m-%d %H:%M:%S", time_zone="UTC")
-        .cast(pl.Datetime("ns", "UTC")),
+    # NOTE: the strings are UTC ISO dates without timezone designator, which
+    # numpy parses directly as (timezone-naive) UTC datetimes.
+    date_begin_ns, date_end_ns = (
+        int(np.datetime64(_, "ns").astype(np.int64))
+        for _ in (cdata.date_begin, cdata.date_end)
     )
 
     # Compute the total duration of the conjunction detection interval (in days).
-    duration = date_df.select(
-        (pl.col("date_end") - pl.col("date_begin")).dt.total_nanoseconds().cast(float)
-    ).item() / (86400 * 1e9)
-
-    # Add a column to df containing the tca in days from the polyjectory
-    # epoch according to mizuba.
-    df = df.with_columns(
-        (
-            # NOTE: the single value in date_begin is splatted into the shape
-            # of pl.col("tca") when subtracting.
-            (pl.col("tca") - date_df["date_begin"]).dt.total_nanoseconds().cast(float)
-            / (86400 * 1e9)
-        ).alias("tca_days")
-    )
+    duration = (date_end_ns - date_begin_ns) / (86400 * 1e9)
 
-    # Extract the tcas in days as a numpy array.
-    tca_days = df["tca_days"].to_numpy()
+    # Compute the tcas in days from the polyjectory epoch according to mizuba.
+    # NOTE: the tcas are extracted as nanoseconds since the UNIX epoch,
+    # and the computation is then carried out directly in numpy.
+    tca_days = (df["tca"].dt.epoch("ns").to_numpy() - date_begin_ns) / (86400 * 1e9)
 
     # Create timespans around the mizuba tcas.
     tspan_delta = 2.0
     N_tp = 50
-    tspans = np.linspace(
-        # NOTE: max/min are necessary in order to avoid
-        # getting out of the polyjectory time bounds.
-        np.maximum(tca_days - tspan_delta / 86400, 0.0),
-        # NOTE: important to use nextafter() here because
-        # the polyjectory time interval is a half-open range.
-        np.minimum(tca_days + tspan_delta / 86400, np.nextafter(duration, 0.0)),
-        N_tp,
-    ).T
-    tspans = np.ascontiguousarray(tspans)
+    # NOTE: max/min are necessary in order to avoid
+    # getting out of the polyjectory time bounds.
+    tspan_begin = np.maximum(tca_days - tspan_delta / 86400, 0.0)
+    # NOTE: important to use nextafter() here because
+    # the polyjectory time interval is a half-open range.
+    tspan_end = np.minimum(tca_days + tspan_delta / 86400, np.nextafter(duration, 0.0))
+    # NOTE: the timespans are filled in place in a row-major array, one row
+    # per conjunction, with the same arithmetic as np.linspace(). This avoids
+    # transposing the output of np.linspace() and copying it into a contiguous
+    # array. As in np.linspace(), the last time point is set exactly to the end
+    # of the timespan, so that rounding cannot push it out of the time bounds.
+    tspans = np.empty((len(tca_days), N_tp))
+    np.multiply(
+        np.arange(N_tp, dtype=float),
+        ((tspan_end - tspan_begin) / (N_tp - 1))[:, None],
+        out=tspans,
+    )
+    tspans += tspan_begin[:, None]
+    tspans[:, -1] = tspan_end
 
     # Compute the states of the objects within the timespans.
-    st_i = pj.state_meval(tspans, obj_idx=pj_id_i)
-    st_j = pj.state_meval(tspans, obj_idx=pj_id_j)
+    # NOTE: the states of both objects are computed with a single call to
+    # state_meval(), by stacking the indices of the two objects and
+    # duplicating the timespans accordingly.
+    st = pj.state_meval(
+        np.concatenate((tspans, tspans)),
+        obj_idx=np.concatenate((pj_id_i, pj_id_j)),
+    )
+    st_i, st_j = st[: len(tspans)], st[len(tspans) :]
 
     # Compute the mutual distances within the timespans.
-    dist = np.linalg.norm(st_i[:, :, :3] - st_j[:, :, :3], axis=2)
+    # NOTE: the squared norms of the position differences are computed
+    # via einsum(), which avoids the temporary array of squared components.
+    # NOTE: the square roots are then computed in place, so that the output
+    # of einsum() is the only buffer allocated for the distances.
+    dr = st_i[:, :, :3] - st_j[:, :, :3]
+    dist = np.einsum("ijk,ijk->ij", dr, dr)
+    np.sqrt(dist, out=dist)
 
-    # We now proceed to construct the dataframe containing the output data.
-    out_df_ld = pl.DataFrame().lazy()
+    # We now proceed to construct the output data.
 
     # First, we convert the time points in tspans to dates for visualisation.
-    # Each tspan gets its own date column.
-    out_df_ld = out_df_ld.with_columns(
-        list(
-            (
-                (pl.Series("tspan", tspans[idx]) * 86400 * 1e9)
-                .cast(pl.UInt64)
-                .cast(pl.Duration("ns"))
-                + date_df["date_begin"]
-            )
-            .dt.strftime("%Y-%m-%d %H:%M:%S.%3f")
-            .alias(f"date_{idx}")
-            for idx in range(tspans.shape[0])
+    # NOTE: tspans is flattened in row-major order, so that the
+    # dates of each row are stored contiguously.
+    dates = (
+        (
+            (pl.Series("tspan", tspans.ravel()) * 86400 * 1e9).cast(pl.Int64)
+            + date_begin_ns
         )
+        .cast(pl.Datetime("ns", "UTC"))
+        .dt.strftime("%Y-%m-%d %H:%M:%S.%3f")
     )
 
-    # Then we add columns for the mutual distances.
-    out_df_ld = out_df_ld.with_columns(
-        list(pl.Series(f"dist_{idx}", dist[idx]) for idx in range(tspans.shape[0]))
+    # Then we pair the dates with the mutual distances, and we
+    # split the result into one list of data points per row.
+    out = (
+        pl.DataFrame({"date": dates, "dist": dist.ravel()})
+        .select(pl.struct("date", "dist").alias("expanded_data"))
+        .to_series()
+        .reshape((tspans.shape[0], N_tp))
+        .arr.to_list()
     )
 
-    # Finally, we collect and transform into the output format.
-    out_df = out_df_ld.collect()
-
-    out = [
-        out_df.select(
-            [
-                pl.col(f"date_{idx}").alias("date"),
-                pl.col(f"dist_{idx}").alias("dist"),
-            ]
-        ).to_dicts()
-        for idx in range(tspans.shape[0])
-    ]
-
     return out
@@ -0,0 +1,163 @@
+import polars as pl
+from typing import Any, Callable, Hashable
+from functools import partial
+from ._request_models import rows_request, range_filter_fns, _col_range_filter
+
+
+# NOTE: the functions below build the filtering expressions from the filter values.
+# The values of the range-based filters have already been converted to floats during
+# the validation of the request (with None signalling a failed conversion), while
+# the norad ID filter value is passed as a string and it is converted here. If the
+# filter value is invalid, None is returned and the filter is ignored.
+
+
+# Filtering based on the exact match of one of the two norad IDs.
+def _norad_ids_filter(filter_v: str) -> pl.Expr | None:
+    # We need to convert the filter value to an int.
+    try:
+        norad_id = int(filter_v)
+    except Exception:
+        return None
+
+    # NOTE: negative norad IDs are not valid, and the filter is ignored.
+    if norad_id < 0:
+        return None
+
+    # NOTE: norad IDs which do not fit in the UInt32 norad ID columns cannot
+    # match any conjunction. The literal cannot be created with the dtype
+    # of the columns, thus we return a filter which rejects all rows.
+    if norad_id >= 2**32:
+        return pl.lit(False)
+
+    # NOTE: the literal is created directly with the dtype of the norad
+    # ID columns, so that no cast is needed during the comparison.
+    return pl.any_horizontal(
+        pl.col("norad_id_i", "norad_id_j") == pl.lit(norad_id, dtype=pl.UInt32)
+    )
+
+
+# Filtering based on object names.
+def _object_names_filter(filter_v: str) -> pl.Expr:
+    # NOTE: the filtering is case-insensitive. In order to implement it,
+    # we convert the filter value to lowercase and we search for it
+    # in the lowercase versions of the object names.
+    substr = filter_v.lower()
+
+    # Check if the user specified names for one or both objects.
+    str_l = substr.split(":")
+
+    if len(str_l) == 2:
+        # The user passed a string of type "a:b". We interpret this
+        # as the user asking for conjunctions in which one object name
+        # contains "a" and the other object name contains "b".
+
+        # Strip the individual names.
+        str_l = list(s.strip() for s in str_l)
+
+        return (
+            (pl.col("object_name_lc_i").str.contains(str_l[0], literal=True))
+            & (pl.col("object_name_lc_j").str.contains(str_l[1], literal=True))
+        ) | (
+            (pl.col("object_name_lc_i").str.contains(str_l[1], literal=True))
+            & (pl.col("object_name_lc_j").str.contains(str_l[0], literal=True))
+        )
+    else:
+        # Interpret substr as a single object name.
+
+        # Strip it.
+        substr = substr.strip()
+
+        return (pl.col("object_name_lc_i").str.contains(substr, literal=True)) | (
+            pl.col("object_name_lc_j").str.contains(substr, literal=True)
+        )
+
+
+# Range-based filtering with the 'between' filter function.
+def _between_filter(col: str, filter_v: list[float | None]) -> pl.Expr | None:
+    lower, upper = filter_v
+    if lower is None or upper is None:
+        return None
+
+    return pl.col(col).is_between(lower, upper, closed="none")
+
+
+# Range-based filtering with the 'between_inclusive' filter function.
+def _between_inclusive_filter(col: str, filter_v: list[float | None]) -> pl.Expr | None:
+    lower, upper = filter_v
+    if lower is None or upper is None:
+        return None
+
+    return pl.col(col).is_between(lower, upper, closed="both")
+
+
+# Range-based filtering with the 'greater_than' filter function.
+def _greater_than_filter(col: str, filter_v: float | None) -> pl.Expr | None:
+    if filter_v is None:
+        return None
+
+    return pl.col(col) > filter_v
+
+
+# Range-based filtering with the 'less_than' filter function.
+def _less_than_filter(col: str, filter_v: float | None) -> pl.Expr | None:
+    if filter_v is None:
+        return None
+
+    return pl.col(col) < filter_v
+
+
+# Dispatch table associating a column name and a filter function
+# to the function building the corresponding filtering expression.
+# NOTE: the consistency between the filter function and the type
+# of the filter value is enforced during the validation of the request.
+_filter_builders: dict[
+    tuple[str, str | range_filter_fns], Callable[[Any], pl.Expr | None]
+] = {
+    ("norad_ids", "contains"): _norad_ids_filter,
+    ("object_names", "contains"): _object_names_filter,
+}
+for _col in _col_range_filter:
+    _filter_builders[(_col, range_filter_fns.between)] = partial(_between_filter, _col)
+    _filter_builders[(_col, range_filter_fns.between_inclusive)] = partial(
+        _between_inclusive_filter, _col
+    )
+    _filter_builders[(_col, range_filter_fns.greater_than)] = partial(
+        _greater_than_filter, _col
+    )
+    _filter_builders[(_col, range_filter_fns.less_than)] = partial(
+        _less_than_filter, _col
+    )
+del _col
+
+
+# Build the list of filtering expressions for the request params.
+def _build_filters(params: rows_request) -> list[pl.Expr]:
+    filters: list[pl.Expr] = []
+
+    for cur_filter in params.filters:
+        # Extract the column's name and the filter function,
+        # and fetch the corresponding builder.
+        col = cur_filter.id
+        builder = _filter_builders[(col, getattr(params.filter_fns, col))]
+
+        # Build the filter, ignoring it if the filter value is invalid.
+        flt = builder(cur_filter.value)
+        if flt is not None:
+            filters.append(flt)
+
+    return filters
+
+
+# Build a normalised, hashable representation of the filters in the request params.
+# NOTE: two requests with the same key are guaranteed to select the same rows.
+def _filters_key(params: rows_request) -> Hashable:
+    return frozenset(
+        (
+            cur_filter.id,
+            getattr(params.filter_fns, cur_filter.id),
+            tuple(cur_filter.value)
+            if isinstance(cur_filter.value, list)
+            else cur_filter.value,
+        )
+        for cur_filter in params.filters
+    )
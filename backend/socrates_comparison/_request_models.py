@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, model_validator
-from typing import Literal, Annotated, Self, TypeAlias
+from pydantic import BaseModel, Field, model_validator, BeforeValidator
+from typing import Literal, Annotated, Self, TypeAlias, Any
 from enum import Enum
 
 
@@ -59,9 +59,44 @@ class object_names_filter(BaseModel):
     value: str
 
 
+# Parse a filter value sent by the frontend into a float.
+# NOTE: the frontend sends the filter values as strings, containing
+# whatever the user has inputted in the filter box. If the conversion
+# to float fails, None is returned and the filter is later ignored.
+def _parse_float_fv(v: Any) -> Any:
+    if not isinstance(v, str):
+        raise ValueError("Filter values must be strings")
+
+    try:
+        return float(v)
+    except ValueError:
+        return None
+
+
+# NOTE: the elements of the list-based filter values may also be null.
+def _parse_nullable_float_fv(v: Any) -> Any:
+    if v is None:
+        return None
+
+    return _parse_float_fv(v)
+
+
+# NOTE: this is a single float value that is passed in the range-based filters.
+# It is parsed from a string during validation, so that the endpoint
+# does not need to perform any conversion.
+float_fv: TypeAlias = Annotated[
+    float | None, BeforeValidator(_parse_float_fv, json_schema_input_type=str)
+]
+
+# NOTE: this is an element of the list-based filter values, which can also be null.
+nullable_float_fv: TypeAlias = Annotated[
+    float | None,
+    BeforeValidator(_parse_nullable_float_fv, json_schema_input_type=str | None),
+]
+
 # NOTE: this is the value that is passed in the range-based filters.
 range_based_fv: TypeAlias = (
-    Annotated[list[str | None], Field(min_length=2, max_length=2)] | str
+    Annotated[list[nullable_float_fv], Field(min_length=2, max_length=2)] | float_fv
 )
 
 
@@ -101,7 +136,7 @@ class relative_speed_diff_filter(BaseModel):
 
 
 # The set of columns which allow range-based filtering.
-_col_range_filter = set(
+_col_range_filter = frozenset(
     [
         "dca",
         "relative_speed",
@@ -111,6 +146,11 @@ _col_range_filter = set(
     ]
 )
 
+# The range-based filter functions which require a list filter value.
+_list_range_filter_fns = frozenset(
+    [range_filter_fns.between, range_filter_fns.between_inclusive]
+)
+
 
 # NOTE: this is the data sent by the frontend when requesting
 # a set of rows to be displayed.
@@ -128,39 +168,41 @@ class rows_request(BaseModel):
     # NOTE: for each *active* filter, we get a filter value (which contains
     # what the user has inputted in the filter box). If no filter
     # is active, this will be an empty array.
+    # NOTE: the filters are validated as a union discriminated by
+    # the filter id, so that for each filter only the matching
+    # model is tried during validation.
     filters: list[
-        norad_ids_filter
-        | object_names_filter
-        | dca_filter
-        | relative_speed_filter
-        | tca_diff_filter
-        | dca_diff_filter
-        | relative_speed_diff_filter
+        Annotated[
+            norad_ids_filter
+            | object_names_filter
+            | dca_filter
+            | relative_speed_filter
+            | tca_diff_filter
+            | dca_diff_filter
+            | relative_speed_diff_filter,
+            Field(discriminator="id"),
+        ]
     ]
 
+    # NOTE: all the checks are performed in a single validator, so that
+    # the filters and the sorting criteria are iterated over only once.
     @model_validator(mode="after")
-    def check_unique_filter_ids(self) -> Self:
-        # The ids in filters must be unique (that is,
-        # we cannot be applying two filters to the same column).
-        id_list = list(_.id for _ in self.filters)
-        if len(set(id_list)) != len(id_list):
-            raise ValueError("The list of ids in 'filters' must be unique")
-
-        return self
-
-    @model_validator(mode="after")
-    def check_filters_consistency(self) -> Self:
-        # For the range-based filters, we have to
-        # make sure that the selected filter function is consistent
-        # with the filter value.
+    def check_filters_sorting(self) -> Self:
+        filter_ids: set[str] = set()
         for flt in self.filters:
+            # The ids in filters must be unique (that is,
+            # we cannot be applying two filters to the same column).
+            if flt.id in filter_ids:
+                raise ValueError("The list of ids in 'filters' must be unique")
+            filter_ids.add(flt.id)
+
+            # For the range-based filters, we have to
+            # make sure that the selected filter function is consistent
+            # with the filter value.
             if flt.id in _col_range_filter:
                 cur_flt_fn = getattr(self.filter_fns, flt.id)
 
-                if cur_flt_fn in [
-                    range_filter_fns.between,
-                    range_filter_fns.between_inclusive,
-                ]:
+                if cur_flt_fn in _list_range_filter_fns:
                     # The filter function is 'between'/'between_inclusive':
                     # the filter value must be a list.
                     if not isinstance(flt.value, list):
@@ -169,19 +211,17 @@ class rows_request(BaseModel):
                         )
                 else:
                     # The filter function is 'less_than'/'greater_than':
-                    # the filter value must be a string.
-                    if not isinstance(flt.value, str):
+                    # the filter value must not be a list.
+                    if isinstance(flt.value, list):
                         raise ValueError(
-                            f"A non-string filter value was detected for the '{cur_flt_fn}' filter function"
+                            f"A list filter value was detected for the '{cur_flt_fn}' filter function"
                         )
 
-        return self
-
-    @model_validator(mode="after")
-    def check_unique_sorting(self) -> Self:
         # Check that the 'sorting' list does not contain duplicate column names.
-        id_list = list(_.id for _ in self.sorting)
-        if len(set(id_list)) != len(id_list):
-            raise ValueError("The list of ids in 'sorting' must be unique")
+        sorting_ids: set[str] = set()
+        for srt in self.sorting:
+            if srt.id in sorting_ids:
+                raise ValueError("The list of ids in 'sorting' must be unique")
+            sorting_ids.add(srt.id)
 
         return self